@@ -27,10 +27,28 @@ import os
 import json
 import sys
 import inspect
+import time
+import functools
+import threading
+from pathlib import Path
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from gql import Client
+from graphql import parse
 from gql.transport.requests import RequestsHTTPTransport
+from gql.transport.exceptions import TransportServerError, TransportQueryError
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        # Encoded like orjson.dumps so either one can be written to a binary file or sent as a request body.
+        return json.dumps(obj).encode()
 
 
 class NoTraceBackWithLineNumber(Exception):
@@ -63,12 +81,55 @@ HTTP_ERRORS = {
     500: "The server encountered an error"
 }
 
+# Access tokens are cached here between runs and refreshed TOKEN_EXPIRY_BUFFER seconds before they expire.
+TOKEN_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'rsc_oracle', 'token.json')
+TOKEN_EXPIRY_BUFFER = 30
+TOKEN_DEFAULT_LIFETIME = 3600
+# Number of keep-alive connections to the GraphQL endpoint.
+GRAPHQL_POOL_SIZE = 8
+
+
+@functools.lru_cache(maxsize=256)
+def parse_query(query):
+    """
+    Parses a GraphQL query string into a document, caching the result so repeated queries are only parsed once.
+    The document is parsed without source locations, which are only used for error reporting.
+
+    Args:
+        query (str): The GraphQL query string.
+    Returns:
+        document (DocumentNode): The parsed query document.
+    """
+    return parse(query, no_location=True)
+
+
+def retry_on_unauthorized(method):
+    """
+    Decorator for RubrikConnection methods that refreshes the access token and retries the call once if RSC
+    rejects the token with a 401.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        access_token = self.access_token
+        try:
+            return method(self, *args, **kwargs)
+        except TransportServerError as err:
+            if err.code != 401:
+                raise
+            self.logger.debug("Access token was rejected. Refreshing and retrying {}...".format(method.__name__))
+            with self.lock:
+                # Another thread may already have replaced the rejected token.
+                if self.access_token == access_token:
+                    self.refresh_access_token()
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class RubrikConnection:
     """
     Creates a Rubrik RSC connection for API commands
     """
-    def __init__(self, keyfile=None, insecure=False):
+    def __init__(self, keyfile=None, insecure=False, logout=False):
         self.logger = logging.getLogger(__name__ + '.RubrikConnection')
         self.logger.debug("Attempting to load json key file. This is the file downloaded when creating the service account in RSC. ")
         self.config = {
@@ -83,22 +144,17 @@ class RubrikConnection:
         else:
             self.certificate_check = True
         self.logger.debug("Using insecure connection: {}".format(insecure))
+        # Without logout the RSC session and cached token are kept so the next command can reuse them.
+        self.logout = logout
         self.logger.debug("Keyfile argument: {}".format(keyfile))
-        if not keyfile:
-            __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
-            self.logger.debug("Checking for keyfile at {}.".format(__location__))
-            __location__ = os.path.split(__location__)[0]
-            __location__ = os.path.split(__location__)[0]
-            __location__ = os.path.join(__location__, 'config')
-            self.logger.debug("The config file location is {}.".format(__location__))
-
-            keyfile = os.path.join(__location__, 'keyfile.json')
-        if os.path.exists(keyfile):
-            with open(keyfile) as config_file:
-                self.config = json.load(config_file)
-            for setting in self.config:
-                if not (self.config[setting] and self.config[setting].strip()):
-                    self.config[setting] = None
+        if keyfile:
+            keyfile = Path(keyfile)
+        else:
+            keyfile = Path(__file__).resolve().parents[2] / 'config' / 'keyfile.json'
+            self.logger.debug("Checking for keyfile at {}.".format(keyfile))
+        if keyfile.is_file():
+            self.config = {setting: (value.strip() or None) if isinstance(value, str) else value
+                           for setting, value in json_loads(keyfile.read_bytes()).items()}
         else:
             self.logger.debug("No keyfile found at {}, trying environment variables".format(keyfile))
         if not self.config['client_id']:
@@ -116,6 +172,80 @@ class RubrikConnection:
         if not self.config['client_id'] or not self.config['client_secret'] or not self.config['access_token_uri']:
             raise RbsOracleConnectionError("No keyfile credentials found in keyfile or environmental variables")
         self.logger.debug("Instantiating RubrikConnection.")
+        self.graphql_url = self.config['access_token_uri'].replace("client_token", "graphql")
+        self.session_url = self.config['access_token_uri'].replace("client_token", "session")
+        self.http_session = requests.Session()
+        self.http_session.verify = self.certificate_check
+        # Retries transient server errors like the gql transport does. The last response is returned rather than
+        # raised so the callers report the status code.
+        self.http_session.mount('https://', HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504], allowed_methods=None, raise_on_status=False)
+        ))
+        self.gql_client = None
+        self.gql_session = None
+        self.access_token = None
+        self.token_expires_at = 0
+        self.headers = None
+        # Guards the gql session and the access token, which queries run from worker threads share.
+        self.lock = threading.RLock()
+        if not self.load_cached_token():
+            self.refresh_access_token()
+
+    def set_access_token(self, access_token, expires_at):
+        self.access_token = access_token
+        self.token_expires_at = expires_at
+        self.headers = {'Content-Type': 'application/json;charset=UTF-8', 'Accept': 'application/json, text/plain',
+                    'Authorization': 'Bearer ' + self.access_token}
+        # Swap the token on the open transport rather than reconnecting so the keep-alive connections survive a refresh.
+        if self.gql_client:
+            self.gql_client.transport.headers = self.headers
+
+    def load_cached_token(self):
+        """
+        Loads the access token saved by a previous connection for the same service account if it is still valid.
+
+        Returns:
+            loaded (bool): True if a valid cached token was loaded.
+        """
+        try:
+            with open(TOKEN_CACHE_FILE, 'rb') as cache_file:
+                cached_token = json_loads(cache_file.read())
+        except (OSError, ValueError):
+            self.logger.debug("No cached access token found at {}.".format(TOKEN_CACHE_FILE))
+            return False
+        if cached_token.get('client_id') != self.config['client_id'] or cached_token.get('access_token_uri') != self.config['access_token_uri']:
+            self.logger.debug("Cached access token belongs to a different service account.")
+            return False
+        if cached_token.get('expires_at', 0) - time.time() <= TOKEN_EXPIRY_BUFFER:
+            self.logger.debug("Cached access token has expired.")
+            return False
+        self.logger.debug("Using cached access token.")
+        self.set_access_token(cached_token['access_token'], cached_token['expires_at'])
+        return True
+
+    def save_cached_token(self):
+        os.makedirs(os.path.dirname(TOKEN_CACHE_FILE), mode=0o700, exist_ok=True)
+        cache_fd = os.open(TOKEN_CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(cache_fd, 'wb') as cache_file:
+            cache_file.write(json_dumps({
+                'client_id': self.config['client_id'],
+                'access_token_uri': self.config['access_token_uri'],
+                'access_token': self.access_token,
+                'expires_at': self.token_expires_at
+            }))
+
+    def clear_cached_token(self):
+        try:
+            os.remove(TOKEN_CACHE_FILE)
+        except OSError:
+            pass
+
+    def refresh_access_token(self):
+        """
+        Obtains a new access token from RSC using the service account credentials and caches it.
+        """
         _payload = {
             "client_id": self.config['client_id'],
             "client_secret": self.config['client_secret'],
@@ -128,50 +258,173 @@ class RubrikConnection:
         self.logger.debug("Access_token_uri: {}".format(self.config['access_token_uri']))
         self.logger.debug("Headers: {}".format(_headers))
         self.logger.debug("Payload: {}".format(_payload))
-        response = requests.post(
+        response = self.http_session.post(
             self.config['access_token_uri'],
-            verify=self.certificate_check,
             json=_payload,
             headers=_headers
         )
-        if response.status_code != 200:
-            if response.status_code in HTTP_ERRORS.keys():
-                self.logger.warning(HTTP_ERRORS[response.status_code])
-        response_json = response.json()
+        self.require_response(response, 200)
+        try:
+            response_json = json_loads(response.content)
+        except ValueError:
+            raise RbsOracleConnectionError("Unable to obtain access token from RSC. The token response is not valid JSON.")
         if 'access_token' not in response_json:
             raise RbsOracleConnectionError("Unable to obtain access token from RSC.")
         self.logger.debug("Service Account session created and Access Token has been obtained...")
-        self.access_token = response_json['access_token']
-        self.headers = {'Content-Type': 'application/json;charset=UTF-8', 'Accept': 'application/json, text/plain',
-                    'Authorization': 'Bearer ' + self.access_token}
+        self.set_access_token(response_json['access_token'], time.time() + response_json.get('expires_in', TOKEN_DEFAULT_LIFETIME))
+        try:
+            self.save_cached_token()
+        except OSError as err:
+            self.logger.debug("Unable to cache access token: {}".format(err))
+
+    def check_response(self, response, expected_status):
+        """
+        Logs the known HTTP error for a response that does not have the expected status code.
+
+        Args:
+            response (Response): The requests response.
+            expected_status (int): The status code of a successful response.
+        Returns:
+            success (bool): True if the response has the expected status code.
+        """
+        if response.status_code == expected_status:
+            return True
+        if response.status_code in HTTP_ERRORS:
+            self.logger.warning(HTTP_ERRORS[response.status_code])
+        return False
+
+    def require_response(self, response, expected_status):
+        """
+        Logs and raises an error for a response that does not have the expected status code.
+
+        Args:
+            response (Response): The requests response.
+            expected_status (int): The status code of a successful response.
+        """
+        if not self.check_response(response, expected_status):
+            raise RbsOracleConnectionError("Request to {} failed with status {}: {}".format(
+                response.url, response.status_code, HTTP_ERRORS.get(response.status_code, response.reason)))
 
     def delete_session(self):
-        end_session_url = self.config['access_token_uri'].replace("client_token", "session")
-        self.logger.debug("End session uri: {}".format(end_session_url))
-        end_session_response = requests.delete(
-            end_session_url,
+        # Worker threads leave the teardown to the main thread so the session isn't closed under the other workers.
+        if threading.current_thread() is not threading.main_thread():
+            self.logger.debug("Leaving the session teardown to the main thread.")
+            return
+        self.close_graphql_session()
+        if not self.logout:
+            self.logger.debug("Keeping the RSC session and cached access token for the next command.")
+            return
+        self.logger.debug("End session uri: {}".format(self.session_url))
+        self.clear_cached_token()
+        end_session_response = self.http_session.delete(
+            self.session_url,
             headers=self.headers
         )
         self.logger.debug("End session response: {}".format(end_session_response))
-        if end_session_response.status_code == 204:
+        if self.check_response(end_session_response, 204):
             self.logger.debug("Session deleted and token has been released...")
+        elif end_session_response.status_code == 401:
+            self.logger.debug("Session has already expired on RSC...")
         else:
             self.logger.warning("Unable to delete session...")
 
-    def graphql_query(self,query, query_variables=None):
-        session_url = self.config['access_token_uri'].replace("client_token", "graphql")
-        self.logger.debug("Session_URL: {}".format(session_url))
-        transport = RequestsHTTPTransport(
-            url=session_url,
-            verify=self.certificate_check,
-            retries=3,
-            headers=self.headers
-        )
-        client = Client(transport=transport, fetch_schema_from_transport=False)
+    def close_graphql_session(self):
+        with self.lock:
+            if self.gql_client:
+                self.gql_client.close_sync()
+                self.gql_client = None
+                self.gql_session = None
+
+    def get_graphql_session(self):
+        """
+        Returns the GraphQL session for this connection, connecting it on first use so the underlying HTTP
+        connection is kept alive and reused by every query.
+
+        Returns:
+            gql_session (SyncClientSession): The connected gql client session.
+        """
+        with self.lock:
+            if not self.gql_session:
+                self.logger.debug("Session_URL: {}".format(self.graphql_url))
+                transport = RequestsHTTPTransport(
+                    url=self.graphql_url,
+                    verify=self.certificate_check,
+                    retries=3,
+                    headers=self.headers
+                )
+                self.gql_client = Client(transport=transport, fetch_schema_from_transport=False)
+                self.gql_session = self.gql_client.connect_sync()
+                # Size the keep-alive pool so queries run from worker threads don't drop connections.
+                transport.session.mount('https://', HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=GRAPHQL_POOL_SIZE,
+                    max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504], allowed_methods=None)
+                ))
+            return self.gql_session
+
+    def check_access_token(self):
+        if self.token_expires_at - time.time() <= TOKEN_EXPIRY_BUFFER:
+            with self.lock:
+                # Checked again under the lock so concurrent queries refresh the token only once.
+                if self.token_expires_at - time.time() <= TOKEN_EXPIRY_BUFFER:
+                    self.logger.debug("Access token is about to expire. Refreshing...")
+                    self.refresh_access_token()
+
+    @retry_on_unauthorized
+    def execute_graphql(self, query, query_variables=None, request_timeout=None):
+        if isinstance(query, str):
+            query = parse_query(query)
+        return self.get_graphql_session().execute(query, variable_values=query_variables, timeout=request_timeout)
+
+    def graphql_query(self,query, query_variables=None, request_timeout=None):
+        """
+        Runs a GraphQL query on the connection's gql session.
+
+        Args:
+            query (DocumentNode or str): The query document or query string.
+            query_variables (dict): The query variables.
+            request_timeout (float or tuple): The request timeout in seconds.
+        Returns:
+            result (dict): The query data.
+        """
+        self.check_access_token()
         try:
-            result = client.execute(query, variable_values=query_variables)
+            result = self.execute_graphql(query, query_variables, request_timeout)
         except Exception as err:
             self.delete_session()
             raise RbsOracleConnectionError(f"Method graphql_query failed with Unexpected {err}")
         return result
 
+    @retry_on_unauthorized
+    def execute_graphql_post(self, query, query_variables=None):
+        response = self.http_session.post(
+            self.graphql_url,
+            data=json_dumps({"query": query, "variables": query_variables}),
+            headers=self.headers
+        )
+        if response.status_code != 200:
+            raise TransportServerError(HTTP_ERRORS.get(response.status_code, response.reason), response.status_code)
+        result = json_loads(response.content)
+        if result.get('errors'):
+            raise TransportQueryError(str(result['errors'][0]), errors=result['errors'], data=result.get('data'))
+        return result['data']
+
+    def graphql_post(self, query, query_variables=None):
+        """
+        Runs a GraphQL query string with a plain POST over the pooled HTTP session, without going through the gql
+        client. Used for the small, fixed lookups where gql's document printing and result handling is most of
+        the client side work.
+
+        Args:
+            query (str): The GraphQL query string.
+            query_variables (dict): The query variables.
+        Returns:
+            result (dict): The query data.
+        """
+        self.check_access_token()
+        try:
+            result = self.execute_graphql_post(query, query_variables)
+        except Exception as err:
+            self.delete_session()
+            raise RbsOracleConnectionError(f"Method graphql_post failed with Unexpected {err}")
+        return result
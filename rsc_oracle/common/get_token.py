@@ -2,6 +2,13 @@ import argparse
 import pprint
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 
 HTTP_ERRORS = {
@@ -12,41 +19,61 @@ HTTP_ERRORS = {
     500: "The server encountered an error"
 }
 
+# One session for all token requests so repeated calls reuse the connection to the token endpoint.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.2, allowed_methods=None)))
+
 pp = pprint.PrettyPrinter(indent=4)
-parser = argparse.ArgumentParser()
-parser.add_argument('-k', '--keyfile', dest='json_keyfile', required=True, help="JSON Keyfile", default=None)
-parser.add_argument('--insecure', help='Deactivate SSL Verification', action="store_true")
-args = parser.parse_args()
-print("Keyfile: {}".format(args.json_keyfile))
-print("Insecure: {}".format(args.insecure))
-with open(args.json_keyfile) as f:
-    json_key = json.load(f)
-
-session_url = json_key['access_token_uri']
-payload = {
-    "client_id": json_key['client_id'],
-    "client_secret": json_key['client_secret'],
-    "name": json_key['name']
-}
-_headers = {
-    'Content-Type': 'application/json;charset=UTF-8',
-    'Accept': 'application/json, text/plain'
-}
-response = requests.post(
-    session_url,
-    json=payload,
-    headers=_headers
-)
-
-if response.status_code != 200:
-    if response.status_code in HTTP_ERRORS.keys():
-        print(HTTP_ERRORS[response.status_code])
-
-response_json = response.json()
-if 'access_token' not in response_json:
-    print("Access token not found")
-    exit(1)
-else:
-    print("Bearer {}".format(response_json['access_token']))
-    print("Service Account session created and Access Token has been obtained...")
-exit()
+
+
+def get_token(keyfile, insecure=False):
+    """
+    Requests an access token from RSC using a service account keyfile.
+
+    Args:
+        keyfile (str): The path to the service account json keyfile.
+        insecure (bool): Skip certificate verification.
+    Returns:
+        response_json (dict): The token response from RSC.
+    """
+    with open(keyfile) as f:
+        json_key = json.load(f)
+
+    session_url = json_key['access_token_uri']
+    payload = {
+        "client_id": json_key['client_id'],
+        "client_secret": json_key['client_secret'],
+        "name": json_key['name']
+    }
+    _headers = {
+        'Content-Type': 'application/json;charset=UTF-8',
+        'Accept': 'application/json, text/plain'
+    }
+    response = SESSION.post(
+        session_url,
+        json=payload,
+        headers=_headers,
+        verify=not insecure
+    )
+
+    if response.status_code != 200:
+        if response.status_code in HTTP_ERRORS:
+            print(HTTP_ERRORS[response.status_code])
+    return json_loads(response.content)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', '--keyfile', dest='json_keyfile', required=True, help="JSON Keyfile", default=None)
+    parser.add_argument('--insecure', help='Deactivate SSL Verification', action="store_true")
+    args = parser.parse_args()
+    print("Keyfile: {}".format(args.json_keyfile))
+    print("Insecure: {}".format(args.insecure))
+    response_json = get_token(args.json_keyfile, args.insecure)
+    if 'access_token' not in response_json:
+        print("Access token not found")
+        exit(1)
+    else:
+        print("Bearer {}".format(response_json['access_token']))
+        print("Service Account session created and Access Token has been obtained...")
+    exit()
@@ -0,0 +1,52 @@
+# Copyright 2020 Rubrik, Inc.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to
+#  deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+#  FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#  DEALINGS IN THE SOFTWARE.
+
+
+"""
+Console logging setup shared by the commands.
+"""
+import logging
+import sys
+
+CONSOLE_HANDLER = None
+
+
+def setup(debug_level):
+    """
+    Sends log records at or above debug_level to stdout. Calling it again only changes the level, so commands
+    invoked repeatedly in one process don't add duplicate handlers.
+
+    Args:
+        debug_level (str): Logging level: DEBUG, INFO, WARNING or CRITICAL.
+    Returns:
+        logger (Logger): The root logger.
+    """
+    global CONSOLE_HANDLER
+    numeric_level = logging.getLevelName(debug_level.upper())
+    if not isinstance(numeric_level, int):
+        raise ValueError('Invalid log level: {}'.format(debug_level))
+    logger = logging.getLogger()
+    if CONSOLE_HANDLER is None:
+        logger.setLevel(logging.NOTSET)
+        CONSOLE_HANDLER = logging.StreamHandler(sys.stdout)
+        CONSOLE_HANDLER.setFormatter(logging.Formatter('%(asctime)s: %(message)s'))
+        logger.addHandler(CONSOLE_HANDLER)
+    CONSOLE_HANDLER.setLevel(numeric_level)
+    return logger
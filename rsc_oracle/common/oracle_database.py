@@ -23,20 +23,521 @@
 Class for an Oracle database object.
 """
 import datetime
-import pytz
+import sys
 import time
+import types
+import random
+import contextlib
+import functools
+import hashlib
+import json
+import os
+from zoneinfo import ZoneInfo
 import logging
-from gql import gql
 from yaspin import yaspin
 from yaspin.spinners import Spinners
 from rsc_oracle.common import connection
 from rsc_oracle.common import rubrik_cluster
 
+# Async request polling: start at POLL_INITIAL_DELAY seconds and double up to POLL_MAX_DELAY,
+# adding up to POLL_JITTER (fraction of the delay) of random jitter to each wait.
+POLL_INITIAL_DELAY = 1.0
+POLL_MAX_DELAY = 30.0
+POLL_JITTER = 0.1
+# (connect, read) timeout in seconds for each status request so a stalled connection can't hang the wait.
+POLL_REQUEST_TIMEOUT = (5, 60)
+
+# GraphQL documents are parsed once at import rather than on every call.
+ASYNC_REQUEST_STATUS_QUERY = connection.parse_query(
+    """
+    query OracleDatabaseAsyncRequestDetails($input: GetOracleAsyncRequestStatusInput!) {
+      oracleDatabaseAsyncRequestDetails(input: $input) {
+        status
+        startTime
+        progress
+        nodeId
+        id
+        error {
+          message
+        }
+        endTime
+      }
+    }
+    """
+)
+
+DB_LOOKUP_QUERY = connection.parse_query(
+    """
+    query OracleDatabaseLookup($filter: [Filter!], $dgFilter: [Filter!], $typeFilter: [HierarchyObjectTypeEnum!]) {
+      oracleDatabases(filter: $filter) {
+        nodes {
+          name
+          id
+          isLiveMount
+          cluster {
+            name
+            id
+            timezone
+          }
+          dataGuardType
+          dataGuardGroup {
+            id
+          }
+          physicalPath {
+            name
+            objectType
+          }
+        }
+      }
+      oracleTopLevelDescendants(filter: $dgFilter, typeFilter: $typeFilter) {
+        nodes {
+          ... on OracleDataGuardGroup {
+            name
+            id
+            cluster {
+              name
+              id
+              timezone
+            }
+            descendantConnection {
+              nodes {
+                ... on OracleDatabase {
+                  dbUniqueName
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+    """
+)
+
+# The detail selections are fragments so the backup info query can request them alongside the log backup
+# config and recovery ranges.
+DG_DETAILS_FRAGMENT = """
+    fragment DataGuardGroupDetails on OracleDataGuardGroup {
+        name
+        id
+        cluster {
+          id
+          name
+          timezone
+        }
+        dataGuardType
+        dbUniqueName
+        isRelic
+        numChannels
+        numInstances
+        slaAssignment
+        effectiveSlaDomain {
+          ... on ClusterSlaDomain {
+            id
+            name
+          }
+          ... on GlobalSlaReply {
+            id
+            name
+          }
+        }
+        descendantConnection {
+          nodes {
+            id
+            name
+            ... on OracleDatabase {
+              dbUniqueName
+              dbRole
+              physicalPath {
+                fid
+                name
+                objectType
+              }
+            }
+          }
+        }
+    }
+    """
+
+DB_DETAILS_FRAGMENT = """
+    fragment OracleDatabaseDetails on OracleDatabase {
+        id
+        name
+        dataGuardType
+        isLiveMount
+        isRelic
+        numChannels
+        physicalPath {
+            name
+            fid
+            objectType
+        }
+        numInstances
+        slaAssignment
+        effectiveSlaDomain {
+          ... on ClusterSlaDomain {
+            name
+          }
+          ... on GlobalSlaReply {
+            id
+            name
+          }
+        }
+        logBackupFrequency
+        logRetentionHours
+        cluster {
+            id
+            name
+            timezone
+        }
+    }
+    """
+
+DG_DETAILS_QUERY = connection.parse_query(
+    """
+    query DataGuardGroupQuery($fid: UUID!) {
+      oracleDataGuardGroup(fid: $fid) {
+        ...DataGuardGroupDetails
+      }
+    }
+    """ + DG_DETAILS_FRAGMENT
+)
+
+DB_DETAILS_QUERY = connection.parse_query(
+    """
+    query OracleDatabase($fid: UUID!) {
+      oracleDatabase(fid: $fid) {
+        ...OracleDatabaseDetails
+      }
+    }
+    """ + DB_DETAILS_FRAGMENT
+)
+
+# Details, log backup config and recovery ranges for the backup info view in one request.
+BACKUP_INFO_QUERY = connection.parse_query(
+    """
+    query OracleBackupInfo($fid: UUID!, $dataguard: Boolean!, $logInput: OracleDbInput!, $rangesInput: GetOracleDbRecoverableRangesInput!) {
+      oracleDatabase(fid: $fid) @skip(if: $dataguard) {
+        ...OracleDatabaseDetails
+      }
+      oracleDataGuardGroup(fid: $fid) @include(if: $dataguard) {
+        ...DataGuardGroupDetails
+      }
+      oracleDatabaseLogBackupConfig(input: $logInput) {
+        hostLogRetentionHours
+        logBackupFrequencyMin
+        logRetentionHours
+      }
+      oracleRecoverableRanges(input: $rangesInput) {
+        data {
+          beginTime
+          endTime
+          status
+        }
+        total
+      }
+    }
+    """ + DB_DETAILS_FRAGMENT + DG_DETAILS_FRAGMENT
+)
+
+DG_SNAPSHOTS_QUERY = connection.parse_query(
+    """
+    query DataGuardGroupSnapshots($fid: UUID!, $first: Int, $after: String) {
+      oracleDataGuardGroup(fid: $fid) {
+        snapshotConnection(first: $first, after: $after) {
+          pageInfo {
+            endCursor
+            hasNextPage
+          }
+          nodes {
+            id
+            date
+          }
+        }
+      }
+    }
+    """
+)
+
+DB_SNAPSHOTS_QUERY = connection.parse_query(
+    """
+    query OracleDatabaseSnapshots($fid: UUID!, $first: Int, $after: String) {
+      oracleDatabase(fid: $fid) {
+        snapshotConnection(first: $first, after: $after) {
+          pageInfo {
+            endCursor
+            hasNextPage
+          }
+          nodes {
+            id
+            date
+          }
+        }
+      }
+    }
+    """
+)
+
+LOG_BACKUP_CONFIG_QUERY = connection.parse_query(
+    """
+    query OracleDatabaseLogBackupConfig($input: OracleDbInput!) {
+      oracleDatabaseLogBackupConfig(input: $input) {
+        hostLogRetentionHours
+        logBackupFrequencyMin
+        logRetentionHours
+      }
+    }
+    """
+)
+
+RECOVERY_RANGES_QUERY = connection.parse_query(
+    """
+    query OracleRecoverableRanges($input: GetOracleDbRecoverableRangesInput!) {
+      oracleRecoverableRanges(input: $input) {
+        data {
+          beginTime
+          endTime
+          status
+        }
+        total
+      }
+    }
+    """
+)
+
+RAC_DETAILS_QUERY = connection.parse_query(
+    """
+    query OracleRac($fid: UUID!) {
+      oracleRac(fid: $fid) {
+        id
+        name
+        nodes {
+          hostFid
+          nodeName
+          status
+        }
+      }
+    }
+    """
+)
+
+LIVE_MOUNT_MUTATION = connection.parse_query(
+    """
+    mutation OracleDatabaseMountMutation($input: MountOracleDatabaseInput!) {
+        mountOracleDatabase(input: $input) {
+            id
+            links {
+                href
+                rel
+                }
+        }
+    }
+    """
+)
+
+CLUSTER_TIMEZONE_QUERY = connection.parse_query(
+    """
+    query Cluster($clusterUuid: UUID!) {
+      cluster(clusterUuid: $clusterUuid) {
+        timezone
+      }
+    }
+    """
+)
+
+ALL_DATABASES_QUERY = connection.parse_query(
+    """
+    query OracleDatabases($filter: [Filter!]) {
+      oracleDatabases(filter: $filter) {
+        nodes {
+          name
+          dbUniqueName
+          isLiveMount
+          numInstances
+          physicalPath {
+            name
+            objectType
+          }
+          cluster {
+            name
+            }
+          dbRole
+          dataGuardType
+          dataGuardGroup {
+            name
+          }
+          slaAssignment
+          effectiveSlaDomain {
+            ... on GlobalSlaReply {
+              name
+            }
+            ... on ClusterSlaDomain {
+              name
+            }
+          }
+        }
+      }
+    }
+    """
+)
+
+LIVE_MOUNTS_QUERY = connection.parse_query(
+    """
+    query GetOracleLiveMounts {
+      oracleLiveMounts {
+        count
+        nodes {
+          cluster {
+            id
+            name
+          }
+          id
+          isFilesOnlyMount
+          isInstantRecovered
+          isReady
+          creationDate
+          mountedDatabase {
+            id
+            dbUniqueName
+            dbRole
+            cluster {
+              id
+              name
+            }
+            physicalPath {
+              fid
+              objectType
+              name
+            }
+          }
+          mountedDatabaseName
+          owner {
+            id
+            groups
+            username
+          }
+          sourceDatabase {
+            id
+            name
+            physicalPath {
+              fid
+              name
+              objectType
+            }
+          }
+          status
+          targetHostMount
+          targetOracleHost {
+            id
+            name
+            physicalPath {
+              fid
+              name
+              objectType
+            }
+          }
+          targetOracleRac {
+            name
+            id
+            physicalPath {
+              fid
+              name
+              objectType
+            }
+          }
+        }
+      }
+    }
+    """
+)
+
+UTC = datetime.timezone.utc
+
+# RSC enum values compared against response fields, named once so the modules and commands share them.
+DATA_GUARD_MEMBER = 'DATA_GUARD_MEMBER'
+ORACLE_DATA_GUARD_GROUP = 'ORACLE_DATA_GUARD_GROUP'
+ORACLE_HOST = 'OracleHost'
+ORACLE_RAC = 'OracleRac'
+
+# Filters shared by the database queries. gql only reads the variables, so the same dicts are reused on every call.
+NOT_RELIC_FILTER = {"field": "IS_RELIC", "texts": ["false"]}
+NOT_REPLICATED_FILTER = {"field": "IS_REPLICATED", "texts": ["false"]}
+PROTECTED_SOURCE_FILTERS = [NOT_RELIC_FILTER, NOT_REPLICATED_FILTER]
+
+
+# Resolved database ids keyed by endpoint, database name, host, cluster name and relic flag, kept for the life of
+# the process so the same database isn't looked up twice.
+DB_ID_CACHE = {}
+
+# The database listing is also kept on disk for INVENTORY_CACHE_TTL seconds so repeated listings from the CLI skip
+# the query. One file per endpoint and filter.
+INVENTORY_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'rsc_oracle')
+INVENTORY_CACHE_TTL = 300
+
+
+def find_by_host(nodes, host):
+    """
+    Finds the first database with the host name in its physicalPath. The scan stops at the first match.
+
+    Args:
+        nodes (list): Database nodes with physicalPath.
+        host (str): The host or RAC cluster name, or part of it.
+    Returns:
+        node (dict): The first matching database node or None.
+    """
+    return next((node for node in nodes if any(host in path['name'] for path in node['physicalPath'])), None)
+
+
+@functools.lru_cache(maxsize=64)
+def get_timezone(timezone):
+    """
+    Returns the time zone object for a time zone name, cached so snapshot listings don't repeat the lookup.
+
+    Args:
+        timezone (str): Time zone name.
+    Returns:
+        timezone (ZoneInfo): The time zone.
+    """
+    return ZoneInfo(timezone)
+
+
+@functools.lru_cache(maxsize=64)
+def resolve_cluster(connection, cluster_name):
+    """
+    Looks up a Rubrik cluster by name, shared by all OracleDatabase objects using the same connection.
+
+    Args:
+        connection (RubrikConnection): The RSC connection.
+        cluster_name (str): The Rubrik cluster name.
+    Returns:
+        cluster (RubrikCluster): The Rubrik cluster object.
+    """
+    return rubrik_cluster.RubrikCluster(connection, cluster_name)
+
+
+@functools.lru_cache(maxsize=256)
+def get_cluster_timezone(connection, cluster_id):
+    """
+    Gets the time zone of a Rubrik cluster. The time zone is cached for the life of the process.
+
+    Args:
+        connection (RubrikConnection): The RSC connection.
+        cluster_id (str): The Rubrik cluster id.
+    Returns:
+        timezone (str): The cluster time zone.
+    """
+    query_variables = {
+        "clusterUuid": cluster_id
+    }
+    cluster_timezone = connection.graphql_query(CLUSTER_TIMEZONE_QUERY, query_variables)
+    return cluster_timezone['cluster']['timezone']
+
 
 class OracleDatabase:
     """
     Rubrik RBS (snappable) Oracle backup object.
     """
+    __slots__ = ('logger', 'cdm_timeout', 'database_name', 'database_host', 'connection', 'relic', 'cluster_name',
+                 'cluster_id', 'timezone', 'id', 'dataguard', 'cluster')
 
     def __init__(self, connection_name, database_name, database_host=None, cluster_name=None, relic="false", timeout=180):
         self.logger = logging.getLogger(__name__ + '.RubrikRscOracleDatabase')
@@ -50,7 +551,39 @@ class OracleDatabase:
         self.timezone = None
         self.id = None
         self.dataguard = False
-        self.get_oracle_db_id()
+        self.cluster = None
+        cache_key = (connection_name.graphql_url, database_name, database_host, cluster_name, relic)
+        if cache_key in DB_ID_CACHE:
+            self.logger.debug("Using cached id for database %s.", database_name)
+            self.id, self.dataguard, self.cluster_id, self.cluster_name, self.timezone = DB_ID_CACHE[cache_key]
+        else:
+            self.get_oracle_db_id()
+            DB_ID_CACHE[cache_key] = (self.id, self.dataguard, self.cluster_id, self.cluster_name, self.timezone)
+
+    def fail(self, message):
+        """
+        Ends the RSC session and raises an OracleDatabaseError. A failure to end the session is ignored so the
+        original error is the one reported.
+
+        Args:
+            message (str): The error message.
+        """
+        try:
+            self.connection.delete_session()
+        except Exception as err:
+            self.logger.debug("Unable to delete session: {}".format(err))
+        raise OracleDatabaseError(message)
+
+    def get_cluster(self):
+        """
+        Returns the Rubrik cluster for the cluster name, resolving it only once.
+
+        Returns:
+            cluster (RubrikCluster): The Rubrik cluster object.
+        """
+        if not self.cluster:
+            self.cluster = resolve_cluster(self.connection, self.cluster_name)
+        return self.cluster
 
     def get_oracle_db_id(self):
         """
@@ -61,60 +594,34 @@ class OracleDatabase:
             Returns:
                 oracle_db_id (str): The Rubrik database object id.
             """
-        query = gql(
-            """
-            query OracleDatabase($filter: [Filter!]) {
-            oracleDatabases(filter: $filter) {
-                nodes {
-                  name
-                  id
-                  cluster {
-                    name
-                    id
-                    timezone
-                  }
-                  dataGuardType
-                  dataGuardGroup {
-                    dataGuardType
-                    dbRole
-                    dbUniqueName
-                    id
-                  }
-                  dbRole
-                  dbUniqueName
-                  isLiveMount
-                  isRelic
-                  physicalPath {
-                    fid
-                    name
-                    objectType
-                  }
-                }
-              }
-            }
-                    """
-        )
-
+        # The Data Guard groups are only used if no database matches the name, but are fetched in the same request
+        # to avoid a second round trip.
         if self.cluster_name:
-            cluster = rubrik_cluster.RubrikCluster(self.connection, self.cluster_name)
+            # The cluster id is usually cached, so it is resolved first and both lookups are filtered to the
+            # cluster on the server.
+            cluster = self.get_cluster()
             self.cluster_id = cluster.id
             self.logger.debug(f"Cluster returned name: {cluster.name}, id: {cluster.id}")
+            cluster_filter = {
+                "field": "CLUSTER_ID",
+                "texts": [cluster.id]
+            }
             query_variables = {
                 "filter": [
                     {
                         "field": "IS_RELIC",
                         "texts": [self.relic]
                     },
-                    {
-                        "field": "CLUSTER_ID",
-                        "texts": [cluster.id]
-                    },
+                    cluster_filter,
                     {
                         "field": "NAME",
                         "texts": [self.database_name]
                     }
                 ],
+                "dgFilter": PROTECTED_SOURCE_FILTERS + [cluster_filter],
+                "typeFilter": ORACLE_DATA_GUARD_GROUP,
             }
+            db_lookup = self.connection.graphql_query(DB_LOOKUP_QUERY, query_variables)
         else:
             query_variables = {
                 "filter": [
@@ -122,139 +629,46 @@ class OracleDatabase:
                         "field": "IS_RELIC",
                         "texts": [self.relic]
                     },
-                    {
-                        "field": "IS_REPLICATED",
-                        "texts": ["false"]
-                    },
+                    NOT_REPLICATED_FILTER,
                     {
                         "field": "NAME",
                         "texts": [self.database_name]
                     }
                 ],
+                "dgFilter": PROTECTED_SOURCE_FILTERS,
+                "typeFilter": ORACLE_DATA_GUARD_GROUP,
             }
+            db_lookup = self.connection.graphql_query(DB_LOOKUP_QUERY, query_variables)
+        self.match_oracle_db_id(db_lookup)
+
+    def match_oracle_db_id(self, db_lookup):
+        """
+            Set the Oracle object id from the result of the database lookup query.
 
-        all_name_match_databases = self.connection.graphql_query(query, query_variables)['oracleDatabases']['nodes']
-        self.logger.debug(f"Oracle DBs with name {self.database_name} returned: {all_name_match_databases}")
-        self.logger.debug("Ignoring Live Mount databases found with name: {}".format(self.database_name))
-        name_match_databases = []
-        for node in all_name_match_databases:
-            if node['isLiveMount'] == False:
-                name_match_databases.append(node)
+            Args:
+                db_lookup (dict): The oracleDatabases and oracleTopLevelDescendants results of DB_LOOKUP_QUERY.
+            """
+        name_match_databases = [node for node in db_lookup['oracleDatabases']['nodes'] if not node['isLiveMount']]
         self.logger.debug(f"Oracle DBs not live mounted with name {self.database_name} returned: {name_match_databases}")
         if len(name_match_databases) == 0:
-            self.logger.debug(f"No Oracle DBs with name {self.database_name} found in oracleDatabases, trying oracleTopLevelDescendants.")
-            query = gql(
-                """
-                query OracleDGGroups($filter: [Filter!], $typeFilter: [HierarchyObjectTypeEnum!]) {
-                  oracleTopLevelDescendants(filter: $filter, typeFilter: $typeFilter) {
-                    nodes {
-                      ... on OracleDataGuardGroup {
-                        objectType
-                        name
-                        id
-                        cluster {
-                          name
-                          id
-                          timezone
-                        }
-                        isRelic
-                        dbUniqueName
-                        dbRole
-                        dataGuardType
-                        dataGuardGroupId
-                        descendantConnection {
-                          nodes {
-                            cluster {
-                              name
-                              id
-                            }
-                            id
-                            name
-                            physicalPath {
-                              fid
-                              name
-                            }
-                            ... on OracleDatabase {
-                              dbUniqueName
-                              isRelic
-                              dbRole
-                              isLiveMount
-                              dataGuardGroup {
-                                id
-                                name
-                                physicalPath {
-                                  fid
-                                  name
-                                }
-                              }
-                            }
-                          }
-                        }
-                      }
-                    }
-                  }
-                }
-                """
-            )
-            if self.cluster_name:
-                cluster = rubrik_cluster.RubrikCluster(self.connection, self.cluster_name)
-                self.logger.debug(f"Cluster returned name: {cluster.name}, id: {cluster.id}")
-                query_variables = {
-                    "filter": [
-                        {
-                            "field": "IS_RELIC",
-                            "texts": ["false"]
-                        },
-                        {
-                            "field": "IS_REPLICATED",
-                            "texts": ["false"]
-                        },
-                        {
-                            "field": "CLUSTER_ID",
-                            "texts": [cluster.id]
-                        }
-                    ],
-                    "typeFilter": "ORACLE_DATA_GUARD_GROUP",
-                }
-            else:
-                query_variables = {
-                    "filter": [
-                        {
-                            "field": "IS_RELIC",
-                            "texts": ["false"]
-                        },
-                        {
-                            "field": "IS_REPLICATED",
-                            "texts": ["false"]
-                        }
-                    ],
-                    "typeFilter": "ORACLE_DATA_GUARD_GROUP",
-                }
-            dg_groups = self.connection.graphql_query(query, query_variables)
+            self.logger.debug(f"No Oracle DBs with name {self.database_name} found in oracleDatabases, checking oracleTopLevelDescendants.")
+            dg_groups = db_lookup['oracleTopLevelDescendants']['nodes']
             self.logger.debug("All dg groups returned: {}".format(dg_groups))
-            dg_ids = []
-            for dg_group in dg_groups['oracleTopLevelDescendants']['nodes']:
-                for connection in dg_group['descendantConnection']['nodes']:
-                    if connection['dbUniqueName'] == self.database_name:
-                        self.logger.debug("Found DB with dbUniqueName")
-                        self.dataguard = True
-                        dg_ids.append([dg_group['id'], dg_group['cluster']['id'], dg_group['cluster']['name'], dg_group['cluster']['timezone']])
+            dg_ids = [(dg_group['id'], dg_group['cluster']['id'], dg_group['cluster']['name'], dg_group['cluster']['timezone'])
+                      for dg_group in dg_groups
+                      if any(member['dbUniqueName'] == self.database_name for member in dg_group['descendantConnection']['nodes'])]
             if not dg_ids:
-                self.connection.delete_session()
-                raise OracleDatabaseError("No database found for database with name or db unique name: {}.".format(self.database_name))
-            elif dg_ids.count(dg_ids[0]) == len(dg_ids):
-                self.id = dg_ids[0][0]
-                self.cluster_id = dg_ids[0][1]
-                self.cluster_name = dg_ids[0][2]
-                self.timezone = dg_ids[0][3]
+                self.fail("No database found for database with name or db unique name: {}.".format(self.database_name))
+            elif len(set(dg_ids)) == 1:
+                self.logger.debug("Found DB with dbUniqueName")
+                self.id, self.cluster_id, self.cluster_name, self.timezone = dg_ids[0]
+                self.dataguard = True
             else:
-                self.connection.delete_session()
-                raise OracleDatabaseError("Multiple DG Groups found for database with name or db unique name: {}.".format(self.database_name))
+                self.fail("Multiple DG Groups found for database with name or db unique name: {}.".format(self.database_name))
             if not self.id:
-                self.connection.delete_session()
-                raise OracleDatabaseError("No database found for database with name or db unique name: {}.".format(self.database_name))
+                self.fail("No database found for database with name or db unique name: {}.".format(self.database_name))
         elif len(name_match_databases) == 1:
-            if name_match_databases[0]['dataGuardType'] == 'DATA_GUARD_MEMBER':
+            if name_match_databases[0]['dataGuardType'] == DATA_GUARD_MEMBER:
                 self.id = name_match_databases[0]['dataGuardGroup']['id']
                 self.dataguard = True
             else:
@@ -266,233 +680,121 @@ class OracleDatabase:
             self.logger.debug("Multiple databases found with name: {}".format(self.database_name))
             if self.database_host:
                 self.logger.debug("Checking for hostname match in physicalPath: {}".format(name_match_databases))
-                for node in name_match_databases:
-                    for path in node['physicalPath']:
-                        if self.database_host in path['name']:
-                            if node['dataGuardType'] == 'DATA_GUARD_MEMBER':
-                                self.id = node['dataGuardGroup']['id']
-                                self.dataguard = True
-                            else:
-                                self.id = node['id']
-                            self.cluster_id = node['cluster']['id']
-                            self.cluster_name = node['cluster']['name']
-                            self.timezone = node['cluster']['timezone']
+                node = find_by_host(name_match_databases, self.database_host)
+                if node:
+                    if node['dataGuardType'] == DATA_GUARD_MEMBER:
+                        self.id = node['dataGuardGroup']['id']
+                        self.dataguard = True
+                    else:
+                        self.id = node['id']
+                    self.cluster_id = node['cluster']['id']
+                    self.cluster_name = node['cluster']['name']
+                    self.timezone = node['cluster']['timezone']
             else:
                 self.logger.debug("Checking if the multiple databases found are part of the same DG Group")
-                hosts = []
                 dg_ids = []
                 for node in name_match_databases:
-                    if node['dataGuardType'] == 'DATA_GUARD_MEMBER':
-                        dg_ids.append([node['dataGuardGroup']['id'], node['cluster']['id'], node['cluster']['name'], node['cluster']['timezone']])
+                    if node['dataGuardType'] == DATA_GUARD_MEMBER:
+                        dg_ids.append((node['dataGuardGroup']['id'], node['cluster']['id'], node['cluster']['name'], node['cluster']['timezone']))
                 if not dg_ids:
-                    self.connection.delete_session()
-                    raise OracleDatabaseError(f"Multiple databases found with name or db unique name: {self.database_name}. Try specifying the host name also.")
-                elif dg_ids.count(dg_ids[0]) == len(dg_ids):
-                    self.id = dg_ids[0][0]
-                    self.cluster_id = dg_ids[0][1]
-                    self.cluster_name = dg_ids[0][2]
-                    self.timezone = dg_ids[0][3]
+                    self.fail(f"Multiple databases found with name or db unique name: {self.database_name}. Try specifying the host name also.")
+                elif len(set(dg_ids)) == 1:
+                    self.id, self.cluster_id, self.cluster_name, self.timezone = dg_ids[0]
                     self.dataguard = True
                 else:
-                    self.connection.delete_session()
-                    raise OracleDatabaseError(
+                    self.fail(
                         "Multiple DG Groups found for database with name or db unique name: {}.".format(
                             self.database_name))
             if not self.id:
-                self.connection.delete_session()
-                raise OracleDatabaseError(
+                hosts = sorted({path['name'] for node in name_match_databases for path in node['physicalPath']
+                                if path['objectType'] in (ORACLE_HOST, ORACLE_RAC)})
+                self.fail(
                     "Database {} found on multiple hosts/RAC clusters: {}. You must specify a host or rac cluster name to obtain a unique id.".format(
                         self.database_name, hosts))
 
     def get_details(self):
         if self.dataguard:
             self.logger.debug("Database is part of a Dataguard Group. Using Dataguard Group details...")
-            query = gql(
-                """
-                query DataGuardGroupQuery($fid: UUID!) {
-                  oracleDataGuardGroup(fid: $fid) {
-                    name
-                    id
-                    cluster {
-                      id
-                      name
-                      timezone
-                    }
-                    dataGuardType
-                    dbUniqueName
-                    isRelic
-                    numChannels
-                    numInstances
-                    slaAssignment
-                    effectiveSlaDomain {
-                      ... on ClusterSlaDomain {
-                        id
-                        name
-                      }
-                      ... on GlobalSlaReply {
-                        id
-                        name
-                      }
-                    }
-                    snapshotConnection {
-                      nodes {
-                        date
-                        id
-                      }
-                    }
-                    descendantConnection {
-                      nodes {
-                        id
-                        name
-                        ... on OracleDatabase {
-                          dbUniqueName
-                          dbRole
-                          physicalPath {
-                            fid
-                            name
-                            objectType
-                          }
-                        }
-                      }
-                    }
-                  }
-                }
-                """
-            )
             query_variables = {
                 "fid": self.id
             }
-            database_details = self.connection.graphql_query(query, query_variables)['oracleDataGuardGroup']
+            database_details = self.connection.graphql_query(DG_DETAILS_QUERY, query_variables)['oracleDataGuardGroup']
         else:
-            query = gql(
-                """     
-                query OracleDatabase($fid: UUID!) {
-                oracleDatabase(fid: $fid) {
-                    id
-                    name
-                    dataGuardType
-                    isLiveMount
-                    isRelic
-                    numChannels
-                    physicalPath {
-                        name
-                        fid
-                        objectType
-                    }
-                    numInstances
-                    slaAssignment
-                    effectiveSlaDomain {
-                      ... on ClusterSlaDomain {
-                        name
-                      }
-                      ... on GlobalSlaReply {
-                        id
-                        name
-                      }
-                    }
-                    logBackupFrequency
-                    logRetentionHours
-                    cluster {
-                        id
-                        name
-                        timezone
-                    }
-                    snapshotConnection {
-                      nodes {
-                        id
-                        date
-                        cluster {
-                          name
-                        }
-                        cdmId
-                      }
-                    }
-                    }
-                }
-                """
-            )
             query_variables = {
                 "fid": self.id
             }
-            database_details = self.connection.graphql_query(query, query_variables)['oracleDatabase']
+            database_details = self.connection.graphql_query(DB_DETAILS_QUERY, query_variables)['oracleDatabase']
         return database_details
 
+    def get_backup_info(self):
+        """
+        Gets the database details, log backup config and recovery ranges in one request.
+
+        Returns:
+            database_details (dict): The database or Data Guard group details.
+            log_backup_details (dict): The log backup config.
+            recovery_ranges (list): The recoverable ranges.
+        """
+        query_variables = {
+            "fid": self.id,
+            "dataguard": self.dataguard,
+            "logInput": {"id": self.id},
+            "rangesInput": {"id": self.id}
+        }
+        backup_info = self.connection.graphql_query(BACKUP_INFO_QUERY, query_variables)
+        if self.dataguard:
+            database_details = backup_info['oracleDataGuardGroup']
+        else:
+            database_details = backup_info['oracleDatabase']
+        return database_details, backup_info['oracleDatabaseLogBackupConfig'], backup_info['oracleRecoverableRanges']['data']
+
+    def iter_snapshots(self, page_size=200):
+        """
+        Pages through the database snapshots so the details query doesn't have to return them all at once.
+
+        Args:
+            page_size (int): Number of snapshots requested per page.
+        Yields:
+            snapshots (list): The snapshot nodes (id and date) of each page.
+        """
+        if self.dataguard:
+            query, result = DG_SNAPSHOTS_QUERY, 'oracleDataGuardGroup'
+        else:
+            query, result = DB_SNAPSHOTS_QUERY, 'oracleDatabase'
+        query_variables = {
+            "fid": self.id,
+            "first": page_size,
+            "after": None
+        }
+        while True:
+            snapshot_connection = self.connection.graphql_query(query, query_variables)[result]['snapshotConnection']
+            yield snapshot_connection['nodes']
+            if not snapshot_connection['pageInfo']['hasNextPage']:
+                break
+            query_variables['after'] = snapshot_connection['pageInfo']['endCursor']
+
     def get_log_backup_details(self):
-        query = gql(
-            """
-            query OracleDatabaseLogBackupConfig($input: OracleDbInput!) {
-              oracleDatabaseLogBackupConfig(input: $input) {
-                hostLogRetentionHours
-                logBackupFrequencyMin
-                logRetentionHours
-              }
-            }
-            """
-        )
         query_variables = {
             "input": {"id": self.id}
         }
-        log_backup_details = self.connection.graphql_query(query, query_variables)
+        log_backup_details = self.connection.graphql_query(LOG_BACKUP_CONFIG_QUERY, query_variables)
         return log_backup_details['oracleDatabaseLogBackupConfig']
 
     def get_recovery_ranges(self):
-        query = gql(
-            """
-            query OracleRecoverableRanges($input: GetOracleDbRecoverableRangesInput!) {
-              oracleRecoverableRanges(input: $input) {
-                data {
-                  beginTime
-                  endTime
-                  status
-                }
-                total
-              }
-            }
-            """
-        )
         query_variables = {
             "input": {"id": self.id}
         }
-        recovery_ranges = self.connection.graphql_query(query, query_variables)
+        recovery_ranges = self.connection.graphql_query(RECOVERY_RANGES_QUERY, query_variables)
         return recovery_ranges['oracleRecoverableRanges']['data']
 
     def get_rac_details(self, rac_id):
-        query = gql(
-            """
-            query OracleRac($fid: UUID!) {
-              oracleRac(fid: $fid) {
-                id
-                name
-                nodes {
-                  hostFid
-                  nodeName
-                  status
-                }
-              }
-            }
-            """
-        )
         query_variables = {
              "fid": rac_id
         }
-        rac_details = self.connection.graphql_query(query, query_variables)
+        rac_details = self.connection.graphql_query(RAC_DETAILS_QUERY, query_variables)
         return rac_details['oracleRac']
 
     def live_mount(self, target_id, time_ms, files_only=True, mount_path=None, rename=True, aco_config_map=None):
-        query = gql(
-            """
-            mutation OracleDatabaseMountMutation($input: MountOracleDatabaseInput!) {
-                mountOracleDatabase(input: $input) {
-                    id
-                    links {
-                        href
-                        rel
-                        }
-                }
-            }
-            """
-        )
-
         query_variables = {
             "input": {
                 "request": {
@@ -511,98 +813,62 @@ class OracleDatabase:
             }
         }
 
-        self.logger.debug(f"Mutation: {query}")
+        self.logger.debug(f"Mutation: {LIVE_MOUNT_MUTATION}")
         self.logger.debug(f"Mutation Variables: {query_variables}")
-        live_mount_details = self.connection.graphql_query(query, query_variables)
+        live_mount_details = self.connection.graphql_query(LIVE_MOUNT_MUTATION, query_variables)
         return live_mount_details
 
     @staticmethod
     def get_cluster_timezone(connection, cluster_id):
-        query = gql(
-            """
-            query Cluster($clusterUuid: UUID!) {
-              cluster(clusterUuid: $clusterUuid) {
-                timezone
-              }
-            }
-            """
-        )
-        query_variables = {
-            "clusterUuid": cluster_id
-        }
-        cluster_timezone = connection.connection.graphql_query(query, query_variables)
-        return cluster_timezone['cluster']['timezone']
+        return get_cluster_timezone(connection, cluster_id)
 
     @staticmethod
-    def get_oracle_databases(connection):
-        query = gql(
+    def get_oracle_databases(connection, cache_ttl=INVENTORY_CACHE_TTL, refresh=False):
         """
-            query OracleDatabases($filter: [Filter!]) {
-              oracleDatabases(filter: $filter) {
-                nodes {
-                  name
-                  dbUniqueName
-                  isLiveMount
-                  numInstances
-                  physicalPath {
-                    name
-                    objectType
-                  }
-                  cluster {
-                    name
-                    }
-                  dbRole
-                  dataGuardType
-                  dataGuardGroup {
-                    name
-                    dbUniqueName
-                  }
-                  slaAssignment              
-                  effectiveSlaDomain {
-                    ... on GlobalSlaReply {
-                      name
-                    }
-                    ... on ClusterSlaDomain {
-                      name
-                    }
-                  }                  
-                }
-              }
-            }
-                    """
-        )
+        Lists the protected Oracle databases that are not live mounts. The listing is reused from the on-disk cache
+        if it is younger than cache_ttl seconds.
 
+        Args:
+            connection (RubrikConnection): The RSC connection.
+            cache_ttl (int): Maximum age in seconds of a cached listing. 0 disables the on-disk cache.
+            refresh (bool): Ignore the cached listing and query RSC.
+        Returns:
+            all_databases (dict): The oracleDatabases query result.
+        """
+        logger = logging.getLogger(__name__ + '.RubrikRscOracleDatabase')
         query_variables = {
-            "filter": [
-                {
-                    "field": "IS_RELIC",
-                    "texts": ["false"]
-                },
-                {
-                    "field": "IS_REPLICATED",
-                    "texts": ["false"]
-                }
-            ],
+            "filter": PROTECTED_SOURCE_FILTERS,
         }
+        cache_key = hashlib.blake2b(json.dumps([connection.graphql_url, query_variables], sort_keys=True).encode(), digest_size=16).hexdigest()
+        cache_file = os.path.join(INVENTORY_CACHE_DIR, "inventory-{}.json".format(cache_key))
+        if cache_ttl and not refresh:
+            try:
+                if time.time() - os.path.getmtime(cache_file) < cache_ttl:
+                    with open(cache_file) as inventory_file:
+                        all_databases = json.load(inventory_file)
+                    logger.debug("Using the cached database listing %s.", cache_file)
+                    return all_databases
+            except (OSError, ValueError):
+                pass
 
-        all_databases = connection.graphql_query(query, query_variables)
-        for db in all_databases['oracleDatabases']['nodes']:
-            dataguard_group, rac, host_cluster = None, None, None
-            for path in db['physicalPath']:
-                if path['objectType'] == 'ORACLE_DATA_GUARD_GROUP':
-                    dataguard_group = path['name']
-                if path['objectType'] == 'OracleRac':
-                    rac = True
-                    host_cluster = path['name']
-                if path['objectType'] == 'OracleHost':
-                    host_cluster = path['name']
-
+        all_databases = connection.graphql_query(ALL_DATABASES_QUERY, query_variables)
+        if cache_ttl:
+            temp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+            try:
+                os.makedirs(INVENTORY_CACHE_DIR, mode=0o700, exist_ok=True)
+                with open(temp_file, 'w') as inventory_file:
+                    json.dump(all_databases, inventory_file)
+                os.replace(temp_file, cache_file)
+            except OSError as err:
+                logger.debug("Unable to write the database listing cache %s: %s", cache_file, err)
         return all_databases
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def cluster_time(time_string, timezone):
         """
-        Converts a time string in a timezone to a user friendly string in that time zone.
+        Converts a time string in a timezone to a user friendly string in that time zone. Results are cached since
+        recovery ranges often start where the previous one ended.
 
         Args:
             time_string (str): Time string.
@@ -610,15 +876,15 @@ class OracleDatabase:
         Returns:
             time_string (str): Time string converted to the supplied time zone.
         """
-        cluster_timezone = pytz.timezone(timezone)
-        utc = pytz.utc
+        cluster_timezone = get_timezone(timezone)
         if time_string.endswith('Z'):
-            time_string = time_string[:-1]
-            datetime_object = utc.localize(datetime.datetime.fromisoformat(time_string))
+            datetime_object = datetime.datetime.fromisoformat(time_string[:-1]).replace(tzinfo=UTC)
         else:
-            datetime_object = cluster_timezone.localize(datetime.datetime.fromisoformat(time_string))
-        cluster_time_object = cluster_timezone.normalize(datetime_object.astimezone(cluster_timezone))
-        return cluster_time_object.isoformat()
+            datetime_object = datetime.datetime.fromisoformat(time_string)
+            # Only a time without an offset is taken to be in the cluster time zone.
+            if datetime_object.tzinfo is None:
+                datetime_object = datetime_object.replace(tzinfo=cluster_timezone)
+        return datetime_object.astimezone(cluster_timezone).isoformat()
 
     @staticmethod
     def epoch_time(iso_time_string, timezone):
@@ -632,35 +898,20 @@ class OracleDatabase:
             epoch_time (str): the epoch time.
         """
         if iso_time_string.endswith('Z'):
-            iso_time_string = iso_time_string[:-1]
-            utc = pytz.utc
-            datetime_object = utc.localize(datetime.datetime.fromisoformat(iso_time_string))
+            datetime_object = datetime.datetime.fromisoformat(iso_time_string[:-1]).replace(tzinfo=UTC)
         else:
-            cluster_timezone = pytz.timezone(timezone)
-            datetime_object = cluster_timezone.localize(datetime.datetime.fromisoformat(iso_time_string))
+            datetime_object = datetime.datetime.fromisoformat(iso_time_string)
+            # Only a time without an offset is taken to be in the cluster time zone.
+            if datetime_object.tzinfo is None:
+                datetime_object = datetime_object.replace(tzinfo=get_timezone(timezone))
+            else:
+                datetime_object = datetime_object.astimezone(get_timezone(timezone))
         return int(datetime_object.timestamp()) * 1000
 
     @staticmethod
     def async_requests_wait(connection, requests_id, cluster_id, timeout):
         timeout_start = time.time()
         terminal_states = ['FAILED', 'CANCELED', 'SUCCEEDED']
-        query = gql(
-            """
-            query OracleDatabaseAsyncRequestDetails($input: GetOracleAsyncRequestStatusInput!) {
-              oracleDatabaseAsyncRequestDetails(input: $input) {
-                status
-                startTime
-                progress
-                nodeId
-                id
-                error {
-                  message
-                }
-                endTime
-              }
-            }
-            """
-        )
         query_variables = {
           "input": {
                 "id": requests_id,
@@ -668,12 +919,20 @@ class OracleDatabase:
             }
         }
         oracle_request = None
-        while time.time() < timeout_start + (timeout * 60):
-            oracle_request = connection.graphql_query(query, query_variables)['oracleDatabaseAsyncRequestDetails']
-            if oracle_request['status'] in terminal_states:
-                break
-            with yaspin(Spinners.line, text='Request status: {}'.format(oracle_request['status'])):
-                time.sleep(10)
+        delay = POLL_INITIAL_DELAY
+        if sys.stdout.isatty():
+            spinner_context = yaspin(Spinners.line, text='Waiting for async request status')
+        else:
+            # No terminal to draw on, so skip the spinner thread and just hold the status text.
+            spinner_context = contextlib.nullcontext(types.SimpleNamespace(text=None))
+        with spinner_context as spinner:
+            while time.time() < timeout_start + (timeout * 60):
+                oracle_request = connection.graphql_query(ASYNC_REQUEST_STATUS_QUERY, query_variables, request_timeout=POLL_REQUEST_TIMEOUT)['oracleDatabaseAsyncRequestDetails']
+                if oracle_request['status'] in terminal_states:
+                    break
+                spinner.text = 'Request status: {}'.format(oracle_request['status'])
+                time.sleep(delay + random.uniform(0, delay * POLL_JITTER))
+                delay = min(POLL_MAX_DELAY, delay * 2)
         if oracle_request['status'] not in terminal_states:
             connection.delete_session()
             raise OracleDatabaseError(
@@ -684,77 +943,7 @@ class OracleDatabase:
 
     @staticmethod
     def get_oracle_mounts(connection):
-        query = gql(
-            """
-                query GetOracleLiveMounts {
-                      oracleLiveMounts {
-                        count
-                        nodes {
-                          cluster {
-                            id
-                            name
-                          }
-                          id
-                          isFilesOnlyMount
-                          isInstantRecovered
-                          isReady
-                          creationDate
-                          mountedDatabase {
-                            id
-                            dbUniqueName
-                            dbRole
-                            cluster {
-                              id
-                              name
-                            }
-                            physicalPath {
-                              fid
-                              objectType
-                              name
-                            }
-                          }
-                          mountedDatabaseName
-                          owner {
-                            id
-                            groups
-                            username
-                          }
-                          sourceDatabase {
-                            id
-                            name
-                            physicalPath {
-                              fid
-                              name
-                              objectType
-                            }
-                          }
-                          status
-                          targetHostMount
-                          targetOracleHost {
-                            id
-                            name
-                            physicalPath {
-                              fid
-                              name
-                              objectType
-                            }
-                          }
-                          targetOracleRac {
-                            name
-                            id
-                            physicalPath {
-                              fid
-                              name
-                              objectType
-                            }
-                          }
-                        }
-                      }
-                    }
-                        """
-        )
-
-        oracle_live_mounts = connection.graphql_query(query)['oracleLiveMounts']['nodes']
+        oracle_live_mounts = connection.graphql_query(LIVE_MOUNTS_QUERY)['oracleLiveMounts']['nodes']
         return oracle_live_mounts
 
 
@@ -23,11 +23,94 @@
 Class for an Oracle host object.
 """
 import datetime
-import pytz
 import logging
-from gql import gql
 from rsc_oracle.common import connection,rubrik_cluster
 
+# Host and RAC lookups share one request. The @skip/@include directives drop the lookups that the target type
+# doesn't need, so a host lookup doesn't return RAC data and vice versa. The target queries are sent as text with
+# graphql_post.
+TARGET_LOOKUP_QUERY = """
+    query OracleTargets($rac: Boolean!, $hostTypeFilter: [HierarchyObjectTypeEnum!], $racTypeFilter: [HierarchyObjectTypeEnum!],
+                        $hostFilter: [Filter!], $racFilter: [Filter!], $clusterRacFilter: [Filter!], $first: Int) {
+      hosts: oracleTopLevelDescendants(typeFilter: $hostTypeFilter, filter: $hostFilter, first: $first) @skip(if: $rac) {
+        nodes {
+          ... on OracleHost {
+            id
+            name
+            cluster {
+            id
+            name
+          }
+          }
+        }
+      }
+      racs: oracleTopLevelDescendants(typeFilter: $racTypeFilter, filter: $racFilter, first: $first) @include(if: $rac) {
+        nodes {
+          ... on OracleRac {
+            name
+            id
+          }
+        }
+      }
+      clusterRacs: oracleTopLevelDescendants(typeFilter: $racTypeFilter, filter: $clusterRacFilter, first: $first) @include(if: $rac) {
+        nodes {
+          ... on OracleRac {
+            name
+            id
+            nodes {
+              nodeName
+            }
+          }
+        }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+      }
+    }
+    """
+# Further pages of the cluster-wide RAC scan, fetched only when the RAC name lookup finds nothing.
+CLUSTER_RACS_QUERY = """
+    query OracleClusterRacs($typeFilter: [HierarchyObjectTypeEnum!], $filter: [Filter!], $first: Int, $after: String) {
+      oracleTopLevelDescendants(typeFilter: $typeFilter, filter: $filter, first: $first, after: $after) {
+        nodes {
+          ... on OracleRac {
+            name
+            id
+            nodes {
+              nodeName
+            }
+          }
+        }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+      }
+    }
+    """
+# Page size of the target lookups. Name lookups that match more than one target are an error, so one page is enough.
+TARGET_PAGE_SIZE = 50
+NOT_RELIC_FILTER = {"field": "IS_RELIC", "texts": ["false"]}
+# Target lookups keyed by endpoint, cluster id, target name and target type, kept for the life of the process.
+TARGET_LOOKUP_CACHE = {}
+
+
+def target_filter(cluster_id, name=None):
+    """
+    Builds the filter for the non-relic Oracle targets on a cluster, optionally limited to a target name.
+
+    Args:
+        cluster_id (str): The Rubrik cluster id.
+        name (str): The target name.
+    Returns:
+        filter (list): The GraphQL filter.
+    """
+    cluster_filter = [NOT_RELIC_FILTER, {"field": "CLUSTER_ID", "texts": [cluster_id]}]
+    if name:
+        cluster_filter.insert(0, {"field": "NAME", "texts": [name]})
+    return cluster_filter
+
 
 class OracleTarget:
     """
@@ -43,62 +126,45 @@ class OracleTarget:
         self.rac = rac
         self.id = None
         self.rac_name = None
+        target_lookup = self.lookup_target()
         if rac:
             self.logger.debug("Source is RAC. Searching for RAC targets.")
-            self.get_oracle_rac_id()
+            self.get_oracle_rac_id(target_lookup['racs']['nodes'], target_lookup['clusterRacs'])
         else:
             self.logger.debug("Source is Single instance. Searching for host targets.")
-            self.get_oracle_host_id()
+            self.get_oracle_host_id(target_lookup['hosts']['nodes'])
 
-    def get_oracle_host_id(self):
+    def lookup_target(self):
         """
-            Get the Oracle object id using database name and the hostname.
+            Look up the Oracle hosts or RAC clusters that can match the target name in a single request.
 
             Args:
-                self (object): Database Object
+                self (object): Target Object
             Returns:
-                oracle_db_id (str): The Rubrik database object id.
-            """
-        query = gql(
+                target_lookup (dict): The hosts, or the racs and clusterRacs, returned by RSC.
             """
-            query OracleHosts($typeFilter: [HierarchyObjectTypeEnum!], $filter: [Filter!]) {
-              oracleTopLevelDescendants(typeFilter: $typeFilter, filter: $filter) {
-                nodes {
-                  ... on OracleHost {
-                    id
-                    name
-                    cluster {
-                    id
-                    name
-                  }
-                  }
-                }
-              }
+        cache_key = (self.connection.graphql_url, self.cluster_id, self.name, self.rac)
+        if cache_key not in TARGET_LOOKUP_CACHE:
+            query_variables = {
+              "rac": self.rac,
+              "first": TARGET_PAGE_SIZE,
+              "hostTypeFilter": "OracleHost",
+              "racTypeFilter": "OracleRac",
+              "hostFilter": target_filter(self.cluster_id, self.name),
+              "racFilter": target_filter(self.cluster_id, self.name),
+              "clusterRacFilter": target_filter(self.cluster_id)
             }
-                    """
-        )
+            TARGET_LOOKUP_CACHE[cache_key] = self.connection.graphql_post(TARGET_LOOKUP_QUERY, query_variables)
+        return TARGET_LOOKUP_CACHE[cache_key]
 
+    def get_oracle_host_id(self, oracle_hosts):
+        """
+            Get the Oracle host id from the hosts matching the target name.
 
-        query_variables = {
-          "typeFilter": "OracleHost",
-          "filter": [
-            {
-              "field": "NAME",
-              "texts": [self.name]
-            },
-            {
-              "field": "IS_RELIC",
-              "texts": ["false"]
-            },
-            {
-              "field": "CLUSTER_ID",
-              "texts": [self.cluster_id]
-            }
-          ]
-        }
-
-        oracle_hosts = self.connection.graphql_query(query, query_variables)['oracleTopLevelDescendants']['nodes']
-        self.logger.debug(f"Oracle hosts returned containing name {self.name}: {oracle_hosts}")
+            Args:
+                oracle_hosts (list): The Oracle hosts returned by the target lookup.
+            """
+        self.logger.debug("Oracle hosts returned containing name %s: %s", self.name, oracle_hosts)
         if len(oracle_hosts) == 0:
             self.connection.delete_session()
             raise OracleTargetError(f"No hosts found with the target host name: {self.name}")
@@ -107,81 +173,50 @@ class OracleTarget:
             self.id = oracle_hosts[0]['id']
         else:
             self.logger.debug("Found multiple hosts")
-            cluster_matches = []
-            for host in oracle_hosts:
-                if host['cluster']['id'] == self.self.cluster_id:
-                    cluster_matches.append(host)
-            if len(cluster_matches) == 0:
-                self.connection.delete_session()
-                raise OracleTargetError(f"No hosts found with the target host name: {self.name} on cluster: {self.cluster_id}")
-            elif len(cluster_matches) == 1:
-                self.id = cluster_matches[0]['id']
+            # The lookup is already limited to this cluster, but the name filter also matches on part of the name.
+            name_matches = [host for host in oracle_hosts if host['name'].lower() == self.name.lower()]
+            if len(name_matches) == 1:
+                self.id = name_matches[0]['id']
             else:
                 self.connection.delete_session()
                 raise OracleTargetError(
                     f"Multiple hosts with name: {self.name} found on cluster: {self.cluster_id}. Please check the Oracle hosts on that cluster.")
         return
 
-    def get_oracle_rac_id(self):
+    def get_cluster_racs(self, cluster_racs):
         """
-            Get the Oracle object id using database name and the hostname.
+            Get all RAC clusters on the Rubrik cluster, fetching the pages after the first page from the target lookup.
 
             Args:
-                self (object): Database Object
+                cluster_racs (dict): The first page of RAC clusters returned by the target lookup.
             Returns:
-                oracle_db_id (str): The Rubrik database object id.
-            """
-        query = gql(
-            """
-            query OracleRacs($typeFilter: [HierarchyObjectTypeEnum!], $filter: [Filter!]){
-              oracleTopLevelDescendants(typeFilter: $typeFilter, filter: $filter){
-                nodes {
-                  ... on OracleRac {
-                    name
-                    id
-                    connectionStatus {
-                      connectivity
-                      timestampMillis
-                    }
-                    nodes {
-                      hostFid
-                      nodeName
-                      status
-                    }
-                    cluster {
-                      id
-                      name
-                    }
-                  }
-                  objectType
-                }
-              }
-            }
+                oracle_racs (list): All RAC clusters on the Rubrik cluster.
             """
-        )
-
+        oracle_racs = list(cluster_racs['nodes'])
+        page_info = cluster_racs['pageInfo']
         query_variables = {
-          "typeFilter": "OracleRac",
-          "filter": [
-            {
-              "field": "NAME",
-              "texts": [self.name]
-            },
-            {
-              "field": "IS_RELIC",
-              "texts": ["false"]
-            },
-            {
-              "field": "CLUSTER_ID",
-              "texts": [self.cluster_id]
-            }
-          ]
+            "typeFilter": "OracleRac",
+            "filter": target_filter(self.cluster_id),
+            "first": TARGET_PAGE_SIZE
         }
+        while page_info['hasNextPage']:
+            query_variables['after'] = page_info['endCursor']
+            cluster_racs = self.connection.graphql_post(CLUSTER_RACS_QUERY, query_variables)['oracleTopLevelDescendants']
+            oracle_racs.extend(cluster_racs['nodes'])
+            page_info = cluster_racs['pageInfo']
+        return oracle_racs
 
-        oracle_racs = self.connection.graphql_query(query, query_variables)['oracleTopLevelDescendants']['nodes']
-        self.logger.debug(f"Oracle hosts returned containing name {self.name} on cluster {self.cluster_id}: {oracle_racs}")
+    def get_oracle_rac_id(self, oracle_racs, cluster_racs):
+        """
+            Get the Oracle RAC id from the RAC clusters matching the target name, falling back to the RAC node names.
+
+            Args:
+                oracle_racs (list): The RAC clusters whose name matches the target name.
+                cluster_racs (dict): The first page of RAC clusters on the Rubrik cluster.
+            """
+        self.logger.debug("Oracle hosts returned containing name %s on cluster %s: %s", self.name, self.cluster_id, oracle_racs)
         if len(oracle_racs) == 0:
-            self.get_oracle_rac_id_by_host()
+            self.get_oracle_rac_id_by_host(self.get_cluster_racs(cluster_racs))
         elif len(oracle_racs) == 1:
             self.logger.debug("Found RAC using RAC name")
             self.id = oracle_racs[0]['id']
@@ -192,78 +227,35 @@ class OracleTarget:
                 f"Multiple hosts with name: {self.name} found on cluster: {self.id}. Please check the Oracle hosts on that cluster.")
         return
 
-    def get_oracle_rac_id_by_host(self):
+    def get_oracle_rac_id_by_host(self, oracle_racs):
         """
-            Get the Oracle object id using database name and the hostname.
+            Get the Oracle RAC id of the RAC cluster with a node name containing the target name.
 
             Args:
-                self (object): Database Object
-            Returns:
-                oracle_db_id (str): The Rubrik database object id.
-            """
-        query = gql(
-            """
-            query OracleRacs($typeFilter: [HierarchyObjectTypeEnum!], $filter: [Filter!]){
-              oracleTopLevelDescendants(typeFilter: $typeFilter, filter: $filter){
-                nodes {
-                  ... on OracleRac {
-                    name
-                    id
-                    connectionStatus {
-                      connectivity
-                      timestampMillis
-                    }
-                    nodes {
-                      hostFid
-                      nodeName
-                      status
-                    }
-                    cluster {
-                      id
-                      name
-                    }
-                  }
-                  objectType
-                }
-              }
-            }
+                oracle_racs (list): All RAC clusters on the Rubrik cluster.
             """
-        )
-
-        query_variables = {
-          "typeFilter": "OracleRac",
-          "filter": [
-            {
-              "field": "IS_RELIC",
-              "texts": ["false"]
-            },
-            {
-              "field": "CLUSTER_ID",
-              "texts": [self.cluster_id]
-            }
-          ]
-        }
-
-        oracle_racs = self.connection.graphql_query(query, query_variables)['oracleTopLevelDescendants']['nodes']
-        self.logger.debug(f"oracle_racs returned containing name {self.name} on cluster {self.cluster_id}: {oracle_racs}")
+        self.logger.debug("oracle_racs returned containing name %s on cluster %s: %s", self.name, self.cluster_id, oracle_racs)
         if len(oracle_racs) == 0:
             self.connection.delete_session()
             raise OracleTargetError(f"No RAC clusters found on cluster id: {self.cluster_id}")
         else:
-            self.logger.debug(f"Looking for RAC cluster containing hostname: {self.name}")
+            self.logger.debug("Looking for RAC cluster containing hostname: %s", self.name)
+            target_name = self.name.lower()
             rac_matches = []
             for rac in oracle_racs:
-                for node in rac['nodes']:
-                    if self.name.lower() in node['nodeName'].lower():
-                        rac_matches.append(rac)
-            self.logger.debug(f"rac_matches: {rac_matches}, length {len(rac_matches)}")
+                if any(target_name in node['nodeName'].lower() for node in rac['nodes']):
+                    rac_matches.append(rac)
+                    # A second match is already an error, so the rest of the RACs don't need to be checked.
+                    if len(rac_matches) > 1:
+                        break
+            self.logger.debug("rac_matches: %s, length %s", rac_matches, len(rac_matches))
             if len(rac_matches) == 0:
                     self.connection.delete_session()
                     raise OracleTargetError(f"No RAC clusters found running on host name: {self.name} on cluster: {self.id}")
             elif len(rac_matches) == 1:
                 self.logger.debug("Found RAC using RAC node name")
                 self.id = rac_matches[0]['id']
-                self.rac_name = oracle_racs[0]['name']
+                self.rac_name = rac_matches[0]['name']
             else:
                 self.connection.delete_session()
                 raise OracleTargetError(
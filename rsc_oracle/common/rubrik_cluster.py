@@ -23,11 +23,30 @@
 Class for an Oracle host object.
 """
 import datetime
-import pytz
 import logging
-from gql import gql
+import os
+import json
+import time
 from rsc_oracle.common import connection
 
+# Cluster ids don't change, so they are cached in the process and on disk for CLUSTER_CACHE_TTL seconds so chained
+# CLI runs against the same cluster skip the clusterConnection query.
+CLUSTER_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'rsc_oracle', 'clusters.json')
+CLUSTER_CACHE_TTL = 86400
+CLUSTER_ID_CACHE = {}
+
+# Sent as text with graphql_post.
+CLUSTER_QUERY = """
+    query ClusterConnection($filter: ClusterFilterInput) {
+      clusterConnection(filter: $filter) {
+        nodes {
+          id
+          name
+        }
+      }
+    }
+    """
+
 
 class RubrikCluster:
     """
@@ -39,7 +58,43 @@ class RubrikCluster:
         self.cdm_timeout = timeout
         self.connection = connection_name
         self.name = cluster_name
-        self.id = self.get_cluster_id()
+        self.id = self.get_cached_cluster_id()
+
+    def get_cached_cluster_id(self):
+        """
+            Get the cluster id from the process or disk cache, looking it up in RSC on a miss.
+
+            Args:
+                self (object): Cluster Name
+            Returns:
+                cluster_id (str): The Rubrik cluster id.
+            """
+        cache_key = "{}|{}".format(self.connection.graphql_url, self.name)
+        if cache_key in CLUSTER_ID_CACHE:
+            return CLUSTER_ID_CACHE[cache_key]
+        try:
+            with open(CLUSTER_CACHE_FILE, 'rb') as cache_file:
+                cluster_cache = connection.json_loads(cache_file.read())
+        except (OSError, ValueError):
+            cluster_cache = {}
+        cached_cluster = cluster_cache.get(cache_key)
+        if cached_cluster and time.time() - cached_cluster['cached_at'] < CLUSTER_CACHE_TTL:
+            self.logger.debug("Using cached cluster id for cluster %s.", self.name)
+            CLUSTER_ID_CACHE[cache_key] = cached_cluster['id']
+            return cached_cluster['id']
+        cluster_id = self.get_cluster_id()
+        CLUSTER_ID_CACHE[cache_key] = cluster_id
+        cluster_cache[cache_key] = {'id': cluster_id, 'cached_at': time.time()}
+        # Written to a temporary file and moved into place so concurrent runs never see a partial file.
+        temp_file = "{}.{}.tmp".format(CLUSTER_CACHE_FILE, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(CLUSTER_CACHE_FILE), mode=0o700, exist_ok=True)
+            with open(temp_file, 'w') as cache_file:
+                json.dump(cluster_cache, cache_file)
+            os.replace(temp_file, CLUSTER_CACHE_FILE)
+        except OSError as err:
+            self.logger.debug("Unable to write the cluster cache %s: %s", CLUSTER_CACHE_FILE, err)
+        return cluster_id
 
     def get_cluster_id(self):
         """
@@ -50,26 +105,13 @@ class RubrikCluster:
             Returns:
                 cluster_id (str): The Rubrik cluster id.
             """
-        query = gql(
-            """
-            query ClusterConnection($filter: ClusterFilterInput) {
-              clusterConnection(filter: $filter) {
-                nodes {
-                  id
-                  name
-                }
-              }
-            }
-                    """
-        )
-
         query_variables = {
             "filter": {
             "name": self.name
             }
         }
 
-        rubrik_cluster = self.connection.graphql_query(query, query_variables)['clusterConnection']['nodes']
+        rubrik_cluster = self.connection.graphql_post(CLUSTER_QUERY, query_variables)['clusterConnection']['nodes']
         if len(rubrik_cluster) == 0:
             self.connection.delete_session()
             raise OracleClusterError(f"No clusters found with the the cluster name: {self.name}")
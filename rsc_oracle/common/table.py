@@ -0,0 +1,54 @@
+# Copyright 2020 Rubrik, Inc.
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to
+#  deal in the Software without restriction, including without limitation the
+#  rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+#  sell copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+#  FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+#  DEALINGS IN THE SOFTWARE.
+
+
+"""
+Plain text tables for the command listings.
+"""
+import numbers
+
+
+def render_table(rows, headers):
+    """
+    Formats rows as a plain text table with a dashed line under the headers. Numbers are right aligned and
+    everything else is left aligned. None is shown as an empty cell.
+
+    Args:
+        rows (list): The table rows, each a list or tuple of cell values.
+        headers (list): The column headers.
+    Returns:
+        table (str): The formatted table.
+    """
+    text_rows = [['' if cell is None else str(cell) for cell in row] for row in rows]
+    widths = [len(header) for header in headers]
+    for row in text_rows:
+        for column, cell in enumerate(row):
+            if len(cell) > widths[column]:
+                widths[column] = len(cell)
+    right_aligned = [any(row[column] is not None for row in rows)
+                     and all(row[column] is None or (isinstance(row[column], numbers.Number) and not isinstance(row[column], bool)) for row in rows)
+                     for column in range(len(headers))]
+    lines = [
+        "  ".join(header.rjust(width) if right else header.ljust(width) for header, width, right in zip(headers, widths, right_aligned)).rstrip(),
+        "  ".join("-" * width for width in widths)
+    ]
+    for row in text_rows:
+        lines.append("  ".join(cell.rjust(width) if right else cell.ljust(width) for cell, width, right in zip(row, widths, right_aligned)).rstrip())
+    return "\n".join(lines)
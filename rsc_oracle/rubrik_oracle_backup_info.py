@@ -1,8 +1,8 @@
 import click
-import logging
 import sys
-from tabulate import tabulate
-from rsc_oracle.common import connection
+from operator import itemgetter
+from rsc_oracle.common import connection, logging_setup
+from rsc_oracle.common import table
 from rsc_oracle.common import oracle_database
 
 
@@ -11,8 +11,10 @@ from rsc_oracle.common import oracle_database
 @click.option('--host_name', '-h', type=str, required=False,  help='The database host or RAC cluster')
 @click.option('--keyfile', '-k', type=str, required=False,  help='The connection keyfile path')
 @click.option('--insecure', is_flag=True,  help='Flag to use insecure connection')
+@click.option('--logout', is_flag=True,  help='End the RSC session instead of keeping it for the next command')
+@click.option('--refresh', is_flag=True,  help='Query RSC for the database list instead of using the cached list')
 @click.option('--debug', is_flag=True,  help='Flag to enable debug mode')
-def cli(database_name, host_name, keyfile, insecure, debug):
+def cli(database_name, host_name, keyfile, insecure, logout, refresh, debug):
     """
     Displays information about the Oracle database object, the available snapshots, and recovery ranges.
     If no source_host_db is supplied, all non-relic Oracle databases will be listed.
@@ -22,45 +24,36 @@ def cli(database_name, host_name, keyfile, insecure, debug):
         debug_level = "DEBUG"
     else:
         debug_level = "Warning"
-    numeric_level = getattr(logging, debug_level.upper(), None)
-    if not isinstance(numeric_level, int):
-        raise ValueError('Invalid log level: {}'.format(debug_level))
-    logger = logging.getLogger()
-    logger.setLevel(logging.NOTSET)
-    ch = logging.StreamHandler(sys.stdout)
-    ch.setLevel(numeric_level)
-    console_formatter = logging.Formatter('%(asctime)s: %(message)s')
-    ch.setFormatter(console_formatter)
-    logger.addHandler(ch)
+    logger = logging_setup.setup(debug_level)
 
-    rubrik = connection.RubrikConnection(keyfile, insecure)
+    rubrik = connection.RubrikConnection(keyfile, insecure, logout)
     if database_name:
         database = oracle_database.OracleDatabase(rubrik, database_name, host_name)
         logger.debug("Database ID: {}".format(database.id))
-        database_details = database.get_details()
+        database_details, log_backup_details, recovery_ranges = database.get_backup_info()
         logger.debug(f"DB Details: {database_details}")
-        log_backup_details = database.get_log_backup_details()
         logger.debug(f"DB log backup Details: {log_backup_details}")
-        recovery_ranges = database.get_recovery_ranges()
         logger.debug(f"Backup recovery ranges: {recovery_ranges}")
         timezone = database_details['cluster']['timezone']
         print("-" * 95)
         if database.dataguard:
             print("Data Guard Group Details ")
             print(f"Data Guard Group Name: {database_details['name']}    ID: {database_details['id']}")
+            member_lines = []
             for node in database_details['descendantConnection']['nodes']:
                 host_type = "None"
                 for path in node['physicalPath']:
-                    if path['objectType'] == 'OracleHost':
+                    if path['objectType'] == oracle_database.ORACLE_HOST:
                         host_type = "Host Name"
                         host_name = path['name']
-                    elif path['objectType'] == 'OracleRac':
+                    elif path['objectType'] == oracle_database.ORACLE_RAC:
                         host_type = "RAC Name"
                         host_name = path['name']
-                print(f"Unique Name: {node['dbUniqueName']}     {host_type}: {host_name}     Role: {node['dbRole']}")
+                member_lines.append(f"Unique Name: {node['dbUniqueName']}     {host_type}: {host_name}     Role: {node['dbRole']}\n")
+            sys.stdout.write(''.join(member_lines))
         else:
             print("Database name: {0}   ID: {1}".format(database_details['name'], database_details['id']))
-            if database_details['physicalPath'][0]['objectType'] == 'OracleRac':
+            if database_details['physicalPath'][0]['objectType'] == oracle_database.ORACLE_RAC:
                 print(f"RAC Cluster Name: {database_details['physicalPath'][0]['name']}    Number of instances: {database_details['numInstances']}")
                 rac_details = database.get_rac_details(database_details['physicalPath'][0]['fid'])
                 print(f"RAC Nodes:")
@@ -74,39 +67,40 @@ def cli(database_name, host_name, keyfile, insecure, debug):
         print(f"Cluster: {database_details['cluster']['name']}    Timezone: {timezone}")
         print("-" * 95)
         print("Available Database Backups (Snapshots):")
-        for snap in database_details['snapshotConnection']['nodes']:
-            print("Database Backup Date: {}   Snapshot ID: {}".format(
-                database.cluster_time(snap['date'], timezone)[:-6], snap['id']))
+        # Each page of snapshots is written in one call rather than a print per line.
+        for snapshots in database.iter_snapshots():
+            sys.stdout.write(''.join("Database Backup Date: {}   Snapshot ID: {}\n".format(
+                database.cluster_time(snap['date'], timezone)[:-6], snap['id']) for snap in snapshots))
         print("-" * 95)
         print("Recoverable ranges:")
-        for recovery_range in recovery_ranges:
-            print("Begin Time: {}   End Time: {}".format(
-                database.cluster_time(recovery_range['beginTime'], timezone)[:-6],
-                database.cluster_time(recovery_range['endTime'], timezone)[:-6]))
+        sys.stdout.write(''.join("Begin Time: {}   End Time: {}\n".format(
+            database.cluster_time(recovery_range['beginTime'], timezone)[:-6],
+            database.cluster_time(recovery_range['endTime'], timezone)[:-6]) for recovery_range in recovery_ranges))
         print('-' * 95)
     else:
-        databases = oracle_database.OracleDatabase.get_oracle_databases(rubrik)['oracleDatabases']['nodes']
+        databases = oracle_database.OracleDatabase.get_oracle_databases(rubrik, refresh=refresh)['oracleDatabases']['nodes']
         db_data = []
         db_headers = ["Database", "DB Unique Name", "Role", "DG_Group", "Host/Cluster", "Instances", "CDM Cluster", "SLA", "Assignment"]
         for db in databases:
-            if not db['isLiveMount']:
-                db_element = [''] * 9
-                db_element[0] = db['name'].lower()
-                for path in db['physicalPath']:
-                    if path['objectType'] == 'OracleRac' or path['objectType'] == 'OracleHost':
-                        db_element[4] = path['name']
-                db_element[5] = db['numInstances']
-                if db['dataGuardType'] == 'DATA_GUARD_MEMBER':
-                    db_element[1] = db['dbUniqueName']
-                    db_element[2] = db['dbRole']
-                    db_element[3] = db['dataGuardGroup']['name']
-                db_element[6] = db['cluster']['name']
-                db_element[7] = db['effectiveSlaDomain']['name']
-                db_element[8] = db['slaAssignment']
-                db_data.append(db_element)
-        db_data.sort(key=lambda x: (x[0], x[1]))
+            if db['isLiveMount']:
+                continue
+            db_element = [''] * 9
+            db_element[0] = db['name'].lower()
+            for path in db['physicalPath']:
+                if path['objectType'] == oracle_database.ORACLE_RAC or path['objectType'] == oracle_database.ORACLE_HOST:
+                    db_element[4] = path['name']
+            db_element[5] = db['numInstances']
+            if db['dataGuardType'] == oracle_database.DATA_GUARD_MEMBER:
+                db_element[1] = db['dbUniqueName']
+                db_element[2] = db['dbRole']
+                db_element[3] = db['dataGuardGroup']['name']
+            db_element[6] = db['cluster']['name']
+            db_element[7] = db['effectiveSlaDomain']['name']
+            db_element[8] = db['slaAssignment']
+            db_data.append(db_element)
+        db_data.sort(key=itemgetter(0, 1))
         print("-" * 162)
-        print(tabulate(db_data, headers=db_headers))
+        print(table.render_table(db_data, db_headers))
         print("-" * 162)
     rubrik.delete_session()
     return
@@ -1,9 +1,6 @@
-
 import click
-import logging
-import sys
-import datetime
-from rsc_oracle.common import connection, oracle_database, oracle_target
+import concurrent.futures
+from rsc_oracle.common import connection, oracle_database, oracle_target, logging_setup
 
 
 @click.command()
@@ -18,8 +15,9 @@ from rsc_oracle.common import connection, oracle_database, oracle_target
 @click.option('--no_wait', is_flag=True, help='Queue Live Mount and exit.')
 @click.option('--keyfile', '-k', type=str, required=False,  help='The connection keyfile path')
 @click.option('--insecure', is_flag=True,  help='Flag to use insecure connection')
+@click.option('--logout', is_flag=True,  help='End the RSC session instead of keeping it for the next command')
 @click.option('--debug', is_flag=True,  help='Flag to enable debug mode')
-def cli(database_name, host, cluster_name, path, restore_time, target, rac, timeout, no_wait, keyfile, insecure, debug):
+def cli(database_name, host, cluster_name, path, restore_time, target, rac, timeout, no_wait, keyfile, insecure, logout, debug):
     """
     This will mount the requested Rubrik Oracle backup set on the provided path.
 
@@ -34,39 +32,48 @@ def cli(database_name, host, cluster_name, path, restore_time, target, rac, time
         debug_level = "DEBUG"
     else:
         debug_level = "Warning"
-    numeric_level = getattr(logging, debug_level.upper(), None)
-    if not isinstance(numeric_level, int):
-        raise ValueError('Invalid log level: {}'.format(debug_level))
-    logger = logging.getLogger()
-    logger.setLevel(logging.NOTSET)
-    ch = logging.StreamHandler(sys.stdout)
-    ch.setLevel(numeric_level)
-    console_formatter = logging.Formatter('%(asctime)s: %(message)s')
-    ch.setFormatter(console_formatter)
-    logger.addHandler(ch)
+    logger = logging_setup.setup(debug_level)
 
-    rubrik = connection.RubrikConnection(keyfile, insecure)
-    database = oracle_database.OracleDatabase(rubrik, database_name, host, cluster_name)
-    logger.debug(f"Database Name, ID: {database_name}, {database.id}, Cluster ID: {database.cluster_id}, Cluster Name: {database.cluster_name}, Timezone: {database.timezone}")
-    database_details = database.get_details()
-    logger.debug(f"DB Details: {database_details}")
     if host and not target:
         target = host
-    host = oracle_target.OracleTarget(rubrik, target, database.cluster_id, rac=rac)
-    logger.debug(f"Target name: {host.name} RAC name: {host.rac_name}, ID: {host.id}")
+    if not target:
+        raise RubrikOracleBackupMountError("A target host or RAC cluster (--target), or a source host (--host), is required for the mount.")
+    rubrik = connection.RubrikConnection(keyfile, insecure, logout)
+    database = oracle_database.OracleDatabase(rubrik, database_name, host, cluster_name)
+    logger.debug("Database Name, ID: %s, %s, Cluster ID: %s, Cluster Name: %s, Timezone: %s",
+                 database_name, database.id, database.cluster_id, database.cluster_name, database.timezone)
+    # The recovery ranges and target lookup only depend on the database, so they run at once. The database details
+    # are only logged, so they are only fetched in debug mode. The workers leave the session open when they fail,
+    # and the session is ended here once all of them have finished.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        target_future = executor.submit(oracle_target.OracleTarget, rubrik, target, database.cluster_id, rac=rac)
+        if not restore_time:
+            recovery_ranges_future = executor.submit(database.get_recovery_ranges)
+        if debug:
+            details_future = executor.submit(database.get_details)
+    try:
+        host = target_future.result()
+        if not restore_time:
+            recovery_ranges = recovery_ranges_future.result()
+        if debug:
+            logger.debug("DB Details: %s", details_future.result())
+    except BaseException:
+        rubrik.delete_session()
+        raise
+    logger.debug("Target name: %s RAC name: %s, ID: %s", host.name, host.rac_name, host.id)
     if restore_time:
         restore_time_ms = database.epoch_time(restore_time, database.timezone)
         logger.warning("Mounting backup pieces for a point in time restore to time: {}.".format(restore_time))
     else:
-        recovery_ranges = database.get_recovery_ranges()
-        latest_recovery_point = (max(recovery_ranges, key=lambda x: datetime.datetime.strptime(x['endTime'].replace('Z',''), "%Y-%m-%dT%H:%M:%S.%f")))['endTime']
+        # The end times are UTC ISO 8601 timestamps in the same format, so they sort correctly as strings.
+        latest_recovery_point = max(recovery_range['endTime'] for recovery_range in recovery_ranges)
         logger.warning(f"Using the latest recovery point: {latest_recovery_point}")
         restore_time_ms = database.epoch_time(latest_recovery_point, database.timezone)
     logger.warning("Starting the mount of the requested {} backup pieces on {}.".format(database_name, target))
 
     live_mount_info = database.live_mount(host.id, restore_time_ms, files_only=True, mount_path=path)['mountOracleDatabase']
-    logger.debug(f"Return from live_mount: {live_mount_info}")
-    logger.debug("No wait flag is set to {}.".format(no_wait))
+    logger.debug("Return from live_mount: %s", live_mount_info)
+    logger.debug("No wait flag is set to %s.", no_wait)
     if no_wait:
         logger.warning("Live mount id: {}.".format(live_mount_info['id']))
         rubrik.delete_session()
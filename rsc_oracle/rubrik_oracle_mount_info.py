@@ -1,8 +1,7 @@
 import click
-import logging
-import sys
-from tabulate import tabulate
-from rsc_oracle.common import connection
+from operator import itemgetter
+from rsc_oracle.common import connection, logging_setup
+from rsc_oracle.common import table
 from rsc_oracle.common import oracle_database
 
 
@@ -12,9 +11,10 @@ from rsc_oracle.common import oracle_database
 @click.option('--mounted_host', '-m', type=str, required=False,  help='The host with the live mount to remove')
 @click.option('--keyfile', '-k', type=str, required=False,  help='The connection keyfile path')
 @click.option('--insecure', is_flag=True,  help='Flag to use insecure connection')
+@click.option('--logout', is_flag=True,  help='End the RSC session instead of keeping it for the next command')
 @click.option('--debug', is_flag=True,  help='Flag to enable debug mode')
 
-def cli(database_name, host_name, mounted_host, keyfile, insecure, debug):
+def cli(database_name, host_name, mounted_host, keyfile, insecure, logout, debug):
     """
     This will print the information about a Rubrik live mount using the database name and the live mount host.
 
@@ -26,18 +26,9 @@ def cli(database_name, host_name, mounted_host, keyfile, insecure, debug):
         debug_level = "DEBUG"
     else:
         debug_level = "Warning"
-    numeric_level = getattr(logging, debug_level.upper(), None)
-    if not isinstance(numeric_level, int):
-        raise ValueError('Invalid log level: {}'.format(debug_level))
-    logger = logging.getLogger()
-    logger.setLevel(logging.NOTSET)
-    ch = logging.StreamHandler(sys.stdout)
-    ch.setLevel(numeric_level)
-    console_formatter = logging.Formatter('%(asctime)s: %(message)s')
-    ch.setFormatter(console_formatter)
-    logger.addHandler(ch)
+    logger = logging_setup.setup(debug_level)
 
-    rubrik = connection.RubrikConnection(keyfile, insecure)
+    rubrik = connection.RubrikConnection(keyfile, insecure, logout)
     if database_name:
         pass
     # if source_host_db and mounted_host:
@@ -61,24 +52,21 @@ def cli(database_name, host_name, mounted_host, keyfile, insecure, debug):
         logger.debug("Source and target host not supplied. Getting full list of mounts")
 
         oracle_live_mounts = oracle_database.OracleDatabase.get_oracle_mounts(rubrik)
-        logger.debug("All mounts: {}".format(oracle_live_mounts))
-        live_mounts = []
+        logger.debug("All mounts: %s", oracle_live_mounts)
         live_mount_headers = ["Cluster", "Source DB", "Mounted Host", "Files Only", "Status", "Created"]
-        for mount in oracle_live_mounts:
-            db_element = [''] * 6
-            db_element[0] = mount.get('cluster', "NA").get('name')
-            db_element[1] = mount.get('sourceDatabase', "NA").get('name')
-            if mount.get('targetOracleHost'):
-                db_element[2] = mount.get('targetOracleHost', "NA").get('name')
-            else:
-                db_element[2] = mount.get('targetOracleRac', "NA").get('name')
-            db_element[3] = mount.get('isFilesOnlyMount', "NA")
-            db_element[4] = mount.get('status', "NA")
-            db_element[5] = mount.get('creationDate', "NA")
-            live_mounts.append(db_element)
-        live_mounts.sort(key=lambda x: (x[0], x[1]))
+        # RSC returns null for a missing cluster, source or target, so fall back to an empty dict before .get('name').
+        live_mounts = sorted(
+            (((mount.get('cluster') or {}).get('name', "NA"),
+              (mount.get('sourceDatabase') or {}).get('name', "NA"),
+              (mount.get('targetOracleHost') or mount.get('targetOracleRac') or {}).get('name', "NA"),
+              mount.get('isFilesOnlyMount', "NA"),
+              mount.get('status', "NA"),
+              mount.get('creationDate', "NA"))
+             for mount in oracle_live_mounts),
+            key=itemgetter(0, 1)
+        )
         print("*" * 100)
-        print(tabulate(live_mounts, headers=live_mount_headers))
+        print(table.render_table(live_mounts, live_mount_headers))
         print("*" * 100)
         rubrik.delete_session()
         return
@@ -6,13 +6,17 @@ setup(
     description='Package of tools to use Rubrik GraphQL API for Oracle',
     author='Julian Zgoda',
     license='MIT',
+    python_requires='>=3.9',
     install_requires=[
         'requests >= 2.18.4, != 2.22.0',
         'urllib3 >= 1.26.5',
-        'gql',
+        'gql[requests] >= 3.5, < 5',
+        'graphql-core >= 3.2',
         'Click',
-        'pytz',
-        'yaspin',
-        'tabulate'
+        'tzdata; sys_platform == "win32"',
+        'yaspin'
     ],
+    extras_require={
+        'fast': ['orjson']
+    },
 )